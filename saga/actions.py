@@ -1,20 +1,27 @@
+import sys
 from dataclasses import dataclass
 from typing import ClassVar
 
-@dataclass
+@dataclass(slots=True)
 class Action:
     """Base class for all actions."""
     type: ClassVar[str]
     
     def __init_subclass__(cls, **kwargs):
-        super().__init_subclass__(**kwargs)
+        # Explicit form: slots=True rebuilds the class, so the zero-argument
+        # super() cell would still point at the original Action.
+        super(Action, cls).__init_subclass__(**kwargs)
         if not hasattr(cls, 'type'):
             cls.type = cls.__name__.upper()
+        if type(cls.__dict__.get('type')) is str:
+            # Interned so type comparisons and lookups hit the identity fast path;
+            # str subclasses such as StrEnum members cannot be interned.
+            cls.type = sys.intern(cls.type)
 
-@dataclass
+@dataclass(slots=True)
 class Increment(Action):
     amount: int = 1
 
-@dataclass
+@dataclass(slots=True)
 class Decrement(Action):
     amount: int = 1
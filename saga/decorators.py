@@ -1,18 +1,22 @@
-from functools import wraps
-from typing import AsyncGenerator
+from inspect import iscoroutinefunction
 
+# Values of the ``__saga_kind__`` attribute set by ``@saga``.
+ASYNC_GENERATOR = "asyncgen"
+COROUTINE = "coroutine"
 
-def saga(func):
-    """Decorator to mark generator functions as sagas"""
 
-    @wraps(func)
-    async def wrapper(*args, **kwargs) -> AsyncGenerator:
-        gen = func(*args, **kwargs)
-        while True:
-            try:
-                effect = await gen.__anext__()
-                yield effect
-            except StopAsyncIteration:
-                break
+def saga_kind(func) -> str:
+    """Classify a saga function as an effect-yielding generator or a plain coroutine."""
+    return COROUTINE if iscoroutinefunction(func) else ASYNC_GENERATOR
+
+
+def saga(func):
+    """Decorator to mark generator functions as sagas.
 
-    return wrapper
\ No newline at end of file
+    The function is returned unchanged so the runtime drives the saga's own
+    generator directly instead of going through a forwarding wrapper. Its kind
+    is recorded so the runtime does not have to inspect it on every run.
+    """
+    func.__is_saga__ = True
+    func.__saga_kind__ = saga_kind(func)
+    return func
@@ -1,52 +1,148 @@
-from typing import TypeVar, Generic, AsyncGenerator, Any, Type, Union
-from dataclasses import dataclass
+from typing import TypeVar, Generic, AsyncGenerator, Any, Callable, Sequence, Type, Union
 from .actions import Action
 
 T = TypeVar('T')
 
-
-class Effect(Generic[T]):
-    """Base class for all effects"""
-    pass
+# Maximum number of recycled instances kept per pooled effect class.
+POOL_SIZE = 64
 
 
-@dataclass
-class Call(Effect[T]):
-    fn: Any
-    args: tuple = ()
-    kwargs: dict = None
+class Effect(Generic[T]):
+    """Base class for all effects.
+
+    Effects are plain slotted classes; ``__match_args__`` lists their fields
+    and drives ``repr`` and equality.
+    """
+    __slots__ = ()
+    __match_args__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__match_args__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__match_args__)
+
+    __hash__ = None
+
+
+class PooledEffect(Effect[T]):
+    """Effect whose instances can be recycled through a per-class free list.
+
+    Instances built with ``new()`` are returned to the pool by the runtime as
+    soon as they have been handled, so they must not be kept or yielded again.
+    Instances built with the regular constructor are never recycled.
+    """
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._pool = []
+
+    @classmethod
+    def _acquire(cls):
+        pool = cls._pool
+        effect = pool.pop() if pool else object.__new__(cls)
+        effect._pooled = True
+        return effect
+
+    def release(self) -> None:
+        """Return an instance built with ``new()`` to its pool."""
+        if not self._pooled:
+            return
+        for name in self.__match_args__:
+            setattr(self, name, None)
+        self._pooled = False
+        pool = self._pool
+        if len(pool) < POOL_SIZE:
+            pool.append(self)
+
+
+class Call(PooledEffect[T]):
+    __slots__ = ('fn', 'args', 'kwargs', '_pooled')
+    __match_args__ = ('fn', 'args', 'kwargs')
 
     def __init__(self, fn: Any, *args, **kwargs):
         self.fn = fn
         self.args = args
         self.kwargs = kwargs if kwargs else None
+        self._pooled = False
+
+    @classmethod
+    def new(cls, fn: Any, *args, **kwargs) -> "Call":
+        effect = cls._acquire()
+        effect.fn = fn
+        effect.args = args
+        effect.kwargs = kwargs if kwargs else None
+        return effect
+
+
+class Put(PooledEffect[None]):
+    __slots__ = ('action', '_pooled')
+    __match_args__ = ('action',)
+
+    def __init__(self, action: Action):
+        self.action = action
+        self._pooled = False
 
+    @classmethod
+    def new(cls, action: Action) -> "Put":
+        effect = cls._acquire()
+        effect.action = action
+        return effect
 
-@dataclass
-class Put(Effect[None]):
-    action: Action
 
+class Take(PooledEffect[Action]):
+    __slots__ = ('pattern', '_pooled')
+    __match_args__ = ('pattern',)
 
-@dataclass
-class Take(Effect[Action]):
-    pattern: Union[str, Type[Action]]  # Can be string for backward compatibility or action class
+    def __init__(self, pattern: Union[str, Type[Action], Callable[[Action], bool]]):
+        self.pattern = pattern  # Action class, type string for backward compatibility, or predicate
+        self._pooled = False
 
+    @classmethod
+    def new(cls, pattern: Union[str, Type[Action], Callable[[Action], bool]] = None) -> "Take":
+        effect = cls._acquire()
+        effect.pattern = pattern
+        return effect
 
-@dataclass
-class Select(Effect[Any]):
-    selector: callable = None
+
+class Select(PooledEffect[Any]):
+    __slots__ = ('selector', '_pooled')
+    __match_args__ = ('selector',)
+
+    def __init__(self, selector: callable = None):
+        self.selector = selector
+        self._pooled = False
+
+    @classmethod
+    def new(cls, selector: callable = None) -> "Select":
+        effect = cls._acquire()
+        effect.selector = selector
+        return effect
 
 
-@dataclass
 class Fork(Effect[None]):
-    saga: AsyncGenerator
+    __slots__ = ('saga',)
+    __match_args__ = ('saga',)
+
+    def __init__(self, saga: AsyncGenerator):
+        self.saga = saga
 
 
-@dataclass
 class All(Effect[list]):
-    effects: list[Effect]
+    __slots__ = ('effects',)
+    __match_args__ = ('effects',)
+
+    def __init__(self, effects: Sequence[Effect]):
+        self.effects = effects
 
 
-@dataclass
 class Race(Effect[dict]):
-    effects: dict[str, Effect]
+    __slots__ = ('effects',)
+    __match_args__ = ('effects',)
+
+    def __init__(self, effects: dict[str, Effect]):
+        self.effects = effects
@@ -1,152 +1,425 @@
 import asyncio
-from asyncio import Queue, TaskGroup, Event, Task, create_task
-from typing import AsyncGenerator, Dict, Any, Callable, List, Union, Type
+from asyncio import Future, TaskGroup, create_task
+from collections import deque
+from contextvars import ContextVar
+from inspect import isawaitable
+from typing import AsyncGenerator, Dict, Any, Callable, List, Optional, Union, Type
 from saga.effects import *
 from saga.actions import Action
+from saga.decorators import COROUTINE, saga_kind
 import logging
+import sys
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Dispatched actions that no Take has claimed yet are kept up to this limit;
+# beyond it the oldest pending action is discarded.
+MAX_PENDING_ACTIONS = 100
+
+# Number of Select results memoized before the cache is reset; selectors
+# written inline as lambdas are new objects on every yield and never hit it.
+MAX_CACHED_SELECTS = 128
+
+# Number of All dispatch plans cached before the cache is reset.
+MAX_CACHED_PLANS = 128
+
+# Number of saga functions whose kind is remembered before the cache is reset.
+MAX_CACHED_SAGAS = 128
+
+# Number of effect subclasses whose handler is remembered before the cache is reset.
+MAX_CACHED_SUBCLASSES = 128
+
+TakePattern = Union[None, str, Type[Action], Callable[[Action], bool]]
+
+# Task group of the innermost SagaRuntime.run(); forked tasks inherit it
+# through their copied context, so nested forks land in the same group.
+_task_group: ContextVar[TaskGroup] = ContextVar("saga_task_group")
+
 class SagaRuntime:
     """Runtime for executing sagas with Redux-style effects."""
     
-    def __init__(self, store = None):
+    def __init__(self, store = None, max_pending_actions: int = MAX_PENDING_ACTIONS):
         self.store = store
-        self._action_queue = Queue[Action](maxsize=100)
+        self._takers: Dict[Any, deque[Future]] = {}
+        self._predicate_takers: deque[tuple[Callable[[Action], bool], Future]] = deque()
+        self._pending_actions = deque[Action](maxlen=max_pending_actions)
+        self._warned_pending_full = False
+        self._select_cache: Dict[Callable, Any] = {}
+        self._plan_cache: Dict[int, tuple[tuple, List[Callable]]] = {}
+        self._last_planned: Optional[tuple] = None
+        self._saga_kinds: Dict[Callable, str] = {}
+        self._subclass_handlers: Dict[type, Callable] = {}
         self.error_handlers = []
-        self._running_sagas = set()
+        self._running_sagas: set[asyncio.Task] = set()
+        self._dispatch = {
+            Call: self._handle_call,
+            Put: self._handle_put,
+            Take: self._handle_take,
+            Select: self._handle_select,
+            Fork: self._handle_fork,
+            All: self._handle_all,
+            Race: self._handle_race,
+        }
 
     async def dispatch(self, action: Action) -> None:
-        """Dispatch an action to the store and action stream."""
-        logger.debug(f"Dispatching action: {action}")
-        if self.store:
-            self.store.dispatch(action)
-        await self._action_queue.put(action)
+        """Dispatch an action to the store and to a waiting Take, if any."""
+        self.dispatch_nowait(action)
+
+    def dispatch_nowait(self, action: Action) -> None:
+        """Dispatch an action without awaiting; delivery never blocks."""
+        logger.debug("Dispatching action: %s", action)
+        store = self.store
+        if store:
+            store.dispatch(action)
+            self._select_cache.clear()
+        if not self._deliver(action):
+            logger.debug("No Take waiting for %s, keeping it pending", action)
+            pending = self._pending_actions
+            if len(pending) == pending.maxlen:
+                # Puts that only feed reducers fill the buffer in normal use,
+                # so only the first drop is worth a warning.
+                log = logger.debug if self._warned_pending_full else logger.warning
+                self._warned_pending_full = True
+                log(
+                    "Pending actions full (%s), dropping unclaimed action: %s",
+                    pending.maxlen, pending[0] if pending else action,
+                )
+            pending.append(action)
 
-    async def _take(self, pattern: Union[str, Type[Action]] = None) -> Action:
+    def _deliver(self, action: Action) -> bool:
+        """Resolve the oldest Take waiting on a pattern that matches the action."""
+        for key in (*type(action).__mro__, action.type):
+            if self._resolve_first(self._takers.get(key), action):
+                return True
+        predicates = self._predicate_takers
+        for entry in list(predicates) if predicates else ():
+            matcher, waiter = entry
+            if waiter.done():
+                continue
+            try:
+                matched = matcher(action)
+            except Exception as e:
+                # A faulty predicate fails its own Take, not the dispatcher.
+                predicates.remove(entry)
+                waiter.set_exception(e)
+                continue
+            if matched:
+                predicates.remove(entry)
+                waiter.set_result(action)
+                return True
+        return self._resolve_first(self._takers.get(None), action)
+
+    @staticmethod
+    def _resolve_first(waiters: deque[Future], action: Action) -> bool:
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(action)
+                return True
+        return False
+
+    @staticmethod
+    def _matcher(pattern: TakePattern) -> Callable[[Action], bool]:
+        """Build the predicate for a Take pattern once, outside any loop."""
+        if pattern is None:
+            return lambda action: True
+        if isinstance(pattern, str):
+            return lambda action: action.type == pattern
+        if isinstance(pattern, type):
+            return lambda action: isinstance(action, pattern)
+        if not callable(pattern):
+            raise TypeError(f"Take pattern must be None, a str, an Action class or a predicate: {pattern!r}")
+        return pattern
+
+    async def _take(self, pattern: TakePattern = None) -> Action:
         """Take an action from the action stream that matches the pattern."""
-        logger.debug(f"Taking action with pattern: {pattern}")
-        while True:
-            action = await self._action_queue.get()
-            logger.debug(f"Got action from queue: {action}")
-            if pattern is None:
-                logger.debug("No pattern, returning action")
-                self._action_queue.task_done()
-                return action
-            elif isinstance(pattern, str) and action.type == pattern:
-                logger.debug(f"Pattern {pattern} matches action type")
-                self._action_queue.task_done()
-                return action
-            elif isinstance(pattern, type) and isinstance(action, pattern):
-                logger.debug(f"Action {action} matches pattern type {pattern}")
-                self._action_queue.task_done()
+        logger.debug("Taking action with pattern: %s", pattern)
+        if type(pattern) is str:
+            # Interned like Action.type, so the index lookup in dispatch hits on identity.
+            pattern = sys.intern(pattern)
+        matcher = self._matcher(pattern)
+        pending = self._pending_actions
+        for i, action in enumerate(pending):
+            if matcher(action):
+                logger.debug("Pending action %s matches pattern %s", action, pattern)
+                del pending[i]
                 return action
-            logger.debug(f"Action {action} doesn't match pattern {pattern}, continuing")
+        waiter = asyncio.get_running_loop().create_future()
+        if matcher is not pattern:
+            # None, type strings and classes are indexed by the pattern itself.
+            waiters, entry = self._takers.setdefault(pattern, deque()), waiter
+        else:
+            waiters, entry = self._predicate_takers, (matcher, waiter)
+        waiters.append(entry)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            # A cancelled Take (e.g. a Race loser) must not linger in the index,
+            # and an action already delivered to it goes back to the front of
+            # the pending buffer instead of being lost.
+            if entry in waiters:
+                waiters.remove(entry)
+            if waiter.done() and not waiter.cancelled():
+                self._pending_actions.appendleft(waiter.result())
+            raise
 
     async def run(self, saga: Callable[..., AsyncGenerator], *args, **kwargs):
-        """Run a saga generator function."""
-        logger.debug(f"Running saga: {saga.__name__}")
+        """Run a saga generator function.
+
+        Sagas forked while it runs share one task group and are awaited
+        before this call returns.
+        """
+        logger.debug("Running saga: %s", saga.__name__)
         async with TaskGroup() as tg:
-            await tg.create_task(self._run_saga(saga, args, kwargs))
+            token = _task_group.set(tg)
+            try:
+                self._spawn(tg, saga, args, kwargs)
+            finally:
+                _task_group.reset(token)
+
+    def _spawn(self, tg: TaskGroup, saga_fn, args, kwargs) -> asyncio.Task:
+        """Start a saga as a task of the group, tracked until it finishes."""
+        task = tg.create_task(self._run_saga(saga_fn, args, kwargs))
+        self._running_sagas.add(task)
+        task.add_done_callback(self._running_sagas.discard)
+        return task
 
     async def _run_saga(self, saga_fn, args, kwargs):
-        """Run a saga generator function and handle its effects."""
-        logger.debug(f"Starting saga function: {saga_fn.__name__}")
+        """Run a saga function, handling the effects it yields."""
+        logger.debug("Starting saga function: %s", saga_fn.__name__)
         try:
+            if self._classify(saga_fn) == COROUTINE:
+                # Sagas that yield no effects are awaited without a generator loop.
+                await saga_fn(*args, **kwargs)
+                logger.debug("Saga completed")
+                return
             gen = saga_fn(*args, **kwargs)
+            # Bound once so each step of the loop only loads locals.
+            handle, asend, debug = self._handle_effect, gen.asend, logger.debug
             effect = await gen.__anext__()
             while True:
-                try:
-                    logger.debug(f"Handling effect: {effect}")
-                    result = await self._handle_effect(effect)
-                    logger.debug(f"Effect result: {result}")
-                    effect = await gen.asend(result)
-                except StopAsyncIteration:
-                    logger.debug("Saga completed")
-                    break
+                debug("Handling effect: %s", effect)
+                result = await handle(effect)
+                debug("Effect result: %s", result)
+                effect = await asend(result)
+        except StopAsyncIteration:
+            logger.debug("Saga completed")
         except Exception as e:
-            logger.error(f"Saga error: {e}", exc_info=True)
+            logger.error("Saga error: %s", e, exc_info=True)
             await self._handle_error(e)
 
+    def _classify(self, saga_fn) -> str:
+        """Look up the kind of a saga function once and remember it."""
+        cache = self._saga_kinds
+        try:
+            return cache[saga_fn]
+        except KeyError:
+            kind = getattr(saga_fn, "__saga_kind__", None) or saga_kind(saga_fn)
+            if len(cache) >= MAX_CACHED_SAGAS:
+                cache.clear()
+            cache[saga_fn] = kind
+            return kind
+        except TypeError:
+            # Unhashable sagas are simply not cached.
+            return getattr(saga_fn, "__saga_kind__", None) or saga_kind(saga_fn)
+
     async def _handle_effect(self, effect: Effect) -> Any:
         """Handle different types of effects."""
-        match effect:
-            case Call(fn, args, kwargs):
-                logger.debug(f"Handling Call effect: {fn.__name__}")
-                return await fn(*args, **(kwargs or {}))
-
-            case Put(action):
-                logger.debug(f"Handling Put effect: {action}")
-                if not self.store:
-                    raise RuntimeError("Cannot use Put effect without a store")
-                await self.dispatch(action)
-                return action
+        handler = self._dispatch.get(type(effect))
+        if handler is None:
+            handler = self._resolve_handler(effect)
+        return await handler(effect)
+
+    def _resolve_handler(self, effect: Effect) -> Callable:
+        """Find the handler of an effect subclass and cache it by exact type.
+
+        Built-in effects hit the handler table on their exact type; only the
+        first instance of a subclass pays for the MRO walk. Subclasses are
+        cached apart from the handler table so reset() can forget them.
+        """
+        cache = self._subclass_handlers
+        effect_type = type(effect)
+        handler = cache.get(effect_type)
+        if handler is not None:
+            return handler
+        for base in effect_type.__mro__[1:]:
+            handler = self._dispatch.get(base)
+            if handler is not None:
+                if len(cache) >= MAX_CACHED_SUBCLASSES:
+                    cache.clear()
+                cache[effect_type] = handler
+                return handler
+        raise ValueError(f"Unknown effect type: {effect}")
+
+    async def _handle_call(self, effect: Call) -> Any:
+        """Call the wrapped function, awaiting its result only if it is awaitable."""
+        fn, args, kwargs = effect.fn, effect.args, effect.kwargs
+        effect.release()
+        logger.debug("Handling Call effect: %r", fn)
+        result = fn(*args, **kwargs) if kwargs is not None else fn(*args)
+        if isawaitable(result):
+            return await result
+        return result
+
+    async def _handle_put(self, effect: Put) -> Action:
+        """Dispatch the action carried by a Put effect."""
+        action = effect.action
+        effect.release()
+        logger.debug("Handling Put effect: %s", action)
+        if not self.store:
+            raise RuntimeError("Cannot use Put effect without a store")
+        self.dispatch_nowait(action)
+        return action
+
+    async def _handle_take(self, effect: Take) -> Action:
+        """Wait for an action matching the Take pattern."""
+        pattern = effect.pattern
+        effect.release()
+        logger.debug("Handling Take effect with pattern: %s", pattern)
+        return await self._take(pattern)
+
+    async def _handle_select(self, effect: Select) -> Any:
+        """Read the store state, optionally through a selector.
 
-            case Take(pattern):
-                logger.debug(f"Handling Take effect with pattern: {pattern}")
-                return await self._take(pattern)
-
-            case Select(selector):
-                logger.debug("Handling Select effect")
-                if not self.store:
-                    raise RuntimeError("Cannot use Select effect without a store")
-                state = self.store.get_state()
-                return selector(state) if selector else state
-
-            case Fork(saga):
-                async with TaskGroup() as tg:
-                    tg.create_task(self._run_saga(saga, (), {}))
-                return None
-
-            case All(effects):
-                logger.debug(f"Handling All effect with {len(effects)} effects")
-                results = [None] * len(effects)
-                async def wrapper(_effect, idx):
-                    results[idx] = await self._handle_effect(_effect)
-                async with TaskGroup() as tg:
-                    for i, effect in enumerate(effects):
-                        tg.create_task(wrapper(effect, i))
-                return results
-
-            case Race(effects):
-                logger.debug(f"Handling Race effect with {len(effects)} effects")
-                return await self._handle_race(effects)
-
-            case _:
-                raise ValueError(f"Unknown effect type: {effect}")
+        Selector results are memoized until the next dispatch, so selectors
+        must be pure and the state must only change through dispatch.
+        """
+        selector = effect.selector
+        effect.release()
+        logger.debug("Handling Select effect")
+        if not self.store:
+            raise RuntimeError("Cannot use Select effect without a store")
+        if not selector:
+            return self.store.get_state()
+        cache = self._select_cache
+        try:
+            return cache[selector]
+        except KeyError:
+            result = selector(self.store.get_state())
+            if len(cache) >= MAX_CACHED_SELECTS:
+                cache.clear()
+            cache[selector] = result
+            return result
+        except TypeError:
+            # Unhashable selectors are simply not memoized.
+            return selector(self.store.get_state())
+
+    async def _handle_fork(self, effect: Fork) -> None:
+        """Start a child saga in the task group of the enclosing run()."""
+        tg = _task_group.get(None)
+        if tg is None:
+            raise RuntimeError("Cannot use Fork effect outside of SagaRuntime.run")
+        self._spawn(tg, effect.saga, (), {})
+        return None
+
+    async def _handle_all(self, effect: All) -> list:
+        """Run effects concurrently and collect their results in order."""
+        effects = effect.effects
+        logger.debug("Handling All effect with %s effects", len(effects))
+        plan = self._plan_for(effects)
+        if len(plan) == 1:
+            # Nothing runs alongside a single effect, so skip the task and gather.
+            return [await plan[0](effects[0])]
+        tasks = [create_task(handler(child)) for handler, child in zip(plan, effects)]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # gather leaves the remaining children running when one fails.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def _plan_for(self, effects) -> List[Callable]:
+        """Resolve the handler for each effect of an All.
+
+        Plans for tuples are cached by identity once the same tuple is seen
+        twice in a row, so a saga that hoists its effect tuple out of a loop
+        resolves the handlers only twice while inline tuples, which are new on
+        every yield, never enter the cache. Lists are mutable and are resolved
+        on every yield.
+        """
+        cacheable = type(effects) is tuple
+        if cacheable:
+            cached = self._plan_cache.get(id(effects))
+            if cached is not None and cached[0] is effects:
+                return cached[1]
+        plan = []
+        for child in effects:
+            handler = self._dispatch.get(type(child))
+            if handler is None:
+                handler = self._resolve_handler(child)
+            plan.append(handler)
+        if cacheable:
+            if effects is self._last_planned:
+                if len(self._plan_cache) >= MAX_CACHED_PLANS:
+                    self._plan_cache.clear()
+                # Keep the tuple alive alongside its plan so its id is not reused.
+                self._plan_cache[id(effects)] = (effects, plan)
+            else:
+                self._last_planned = effects
+        return plan
 
     async def _handle_error(self, error: Exception):
         """Handle saga errors."""
-        logger.error(f"Handling error: {error}")
+        logger.error("Handling error: %s", error)
         for handler in self.error_handlers:
             await handler(error)
         raise error
 
-    async def _handle_race(self, effects: Dict[str, Effect]) -> Dict[str, Any]:
+    async def _handle_race(self, effect: Race) -> Dict[str, Any]:
         """Handle race between multiple effects."""
-        logger.debug(f"Starting race between {len(effects)} effects")
-        done = Event()
-        results = {}
-
-        async def run_effect(key: str, effect: Effect):
+        effects = effect.effects
+        if not effects:
+            raise ValueError("Race requires at least one effect")
+        logger.debug("Starting race between %s effects", len(effects))
+        if len(effects) == 1:
+            # A single effect wins by default; await it without a task.
+            (key, child), = effects.items()
             try:
-                results[key] = await self._handle_effect(effect)
-                done.set()
+                return {key: await self._handle_effect(child)}
             except Exception as e:
-                results[key] = e
-                done.set()
+                return {key: e}
+        tasks = {create_task(self._handle_effect(child)): key for key, child in effects.items()}
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-        async with TaskGroup() as tg:
-            for key, effect in effects.items():
-                tg.create_task(run_effect(key, effect))
-            await done.wait()
+        winner = next(task for task in tasks if task in done)
+        # Losing Takes that already received an action give it back, oldest first.
+        for task, key in reversed(tasks.items()):
+            if task is not winner and isinstance(effects[key], Take) \
+                    and not task.cancelled() and task.exception() is None:
+                self._pending_actions.appendleft(task.result())
+        error = winner.exception()
+        return {tasks[winner]: error if error is not None else winner.result()}
 
-        return results
+    def reset(self) -> None:
+        """Cancel running sagas and waiting Takes, and drop pending actions and cached results."""
+        for task in self._running_sagas:
+            task.cancel()
+        self._running_sagas.clear()
+        for waiters in self._takers.values():
+            for waiter in waiters:
+                waiter.cancel()
+        for _, waiter in self._predicate_takers:
+            waiter.cancel()
+        self._takers.clear()
+        self._predicate_takers.clear()
+        self._pending_actions.clear()
+        self._select_cache.clear()
+        self._plan_cache.clear()
+        self._last_planned = None
+        self._saga_kinds.clear()
+        self._subclass_handlers.clear()
 
     def set_store(self, store):
         """Set the Redux store for state management."""
         self.store = store
+        self._select_cache.clear()
 
     def add_error_handler(self, handler):
         """Add an error handler for saga errors."""
@@ -1,15 +1,47 @@
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional, Type
 from .actions import Action
 
+Reducer = Callable[[Dict[str, Any], Action], Dict[str, Any]]
+
+
 class Store:
     """Simple store for state management."""
-    
+
+    # Created by the first register_reducer(), so subclasses whose __init__
+    # skips Store.__init__ still work and dispatch needs no attribute probe.
+    _reducers: Optional[Dict[Type[Action], Reducer]] = None
+
     def __init__(self, initial_state: Dict[str, Any] = None):
         self.state = initial_state or {}
 
     def get_state(self) -> Dict[str, Any]:
         return self.state
 
+    def register_reducer(self, action_type: Type[Action], reducer: Reducer) -> None:
+        """Register ``reducer(state, action) -> state`` for an action class.
+
+        Reducers are looked up by the exact action class, so any callable
+        works, including functions compiled ahead of time (e.g. with numba).
+        """
+        if self._reducers is None:
+            self._reducers = {}
+        self._reducers[action_type] = reducer
+
+    def reducer(self, action_type: Type[Action]) -> Callable[[Reducer], Reducer]:
+        """Decorator form of ``register_reducer``."""
+        def decorator(fn: Reducer) -> Reducer:
+            self.register_reducer(action_type, fn)
+            return fn
+        return decorator
+
     def dispatch(self, action: Action) -> Action:
-        """Process an action. Override this method to implement state updates."""
+        """Process an action with its registered reducer, if any.
+
+        Override this method to implement state updates differently.
+        """
+        reducers = self._reducers
+        if reducers is not None:
+            reducer = reducers.get(type(action))
+            if reducer is not None:
+                self.state = reducer(self.state, action)
         return action
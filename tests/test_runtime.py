@@ -1,34 +1,58 @@
 import pytest
+import pytest_asyncio
 import asyncio
 from typing import Dict, Any
-from saga.runtime import SagaRuntime
+from saga.runtime import MAX_CACHED_SELECTS, SagaRuntime
 from saga.effects import Call, Put, Take, Select, Fork, All, Race
 from saga.store import Store
+from saga.decorators import ASYNC_GENERATOR, COROUTINE, saga
 from saga.actions import Action, Increment, Decrement
 from dataclasses import dataclass
+from enum import StrEnum
 
 # Mock store for testing
-@dataclass
+@dataclass(slots=True)
 class IncrementRequested(Action):
     pass
 
 class MockStore(Store):
     def __init__(self, state=None):
-        self.state = state if state else {}
+        super().__init__(state)
+        self.register_reducer(Increment, lambda state, action: self._apply(state, action.amount))
+        self.register_reducer(Decrement, lambda state, action: self._apply(state, -action.amount))
 
-    def dispatch(self, action: Action) -> Action:
-        match action:
-            case Increment(amount=amount):
-                self.state["counter"] = self.state.get("counter", 0) + amount
-            case Decrement(amount=amount):
-                self.state["counter"] = self.state.get("counter", 0) - amount
-        return action
+    @staticmethod
+    def _apply(state, delta):
+        state["counter"] = state.get("counter", 0) + delta
+        return state
+
+@pytest.fixture(scope="module")
+def runtime():
+    """One runtime and store shared by the tests of this module"""
+    return SagaRuntime(MockStore())
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_runtime(runtime):
+    yield
+    runtime.reset()
+    runtime.store.state.clear()
+
+async def run_saga_until(runtime, saga, *dispatches, timeout=5):
+    """Run a saga to completion, dispatching the given actions once it has started"""
+    task = asyncio.create_task(runtime.run(saga))
+    # run() starts the saga in its own task, so yield until it is waiting on
+    # a Take. Sagas that never Take simply exhaust the bounded number of tries.
+    for _ in range(10):
+        await asyncio.sleep(0)
+        if runtime._takers or runtime._predicate_takers or task.done():
+            break
+    for action in dispatches:
+        await runtime.dispatch(action)
+    await asyncio.wait_for(task, timeout)
 
 @pytest.mark.asyncio
-async def test_basic_saga_workflow():
+async def test_basic_saga_workflow(runtime):
     """Test a basic saga that increments a counter"""
-    done = asyncio.Event()
-    
     async def increment_saga():
         # Take an INCREMENT_REQUESTED action
         yield Take(IncrementRequested)
@@ -37,23 +61,31 @@ async def test_basic_saga_workflow():
         # Select the current state
         state = yield Select(lambda s: s["counter"])
         assert state == 1
-        done.set()
-        
-    store = MockStore({"counter": 0})
-    runtime = SagaRuntime(store)
-    
-    async with asyncio.TaskGroup() as tg:
-        tg.create_task(runtime.run(increment_saga))
-        # Dispatch an action
-        await runtime.dispatch(IncrementRequested())
-        # Wait for saga to complete
-        await done.wait()
         
+    await run_saga_until(runtime, increment_saga, IncrementRequested())
+
 @pytest.mark.asyncio
-async def test_parallel_effects():
+async def test_select_is_memoized_until_dispatch(runtime):
+    """Test that repeated Selects reuse the selector result until the state changes"""
+    calls = []
+
+    def counter(state):
+        calls.append(state["counter"])
+        return state["counter"]
+
+    async def select_saga():
+        assert (yield Select(counter)) == 0
+        assert (yield Select(counter)) == 0
+        yield Put(Increment(amount=2))
+        assert (yield Select(counter)) == 2
+
+    runtime.store.state["counter"] = 0
+    await run_saga_until(runtime, select_saga)
+    assert calls == [0, 2]
+
+@pytest.mark.asyncio
+async def test_parallel_effects(runtime):
     """Test running multiple effects in parallel using All"""
-    done = asyncio.Event()
-    
     async def delay(ms):
         await asyncio.sleep(ms / 1000)
         return ms
@@ -65,20 +97,62 @@ async def test_parallel_effects():
             Call(delay, 30)
         ])
         assert results == [10, 20, 30]
-        done.set()
         
-    runtime = SagaRuntime()  # No store needed for Call effects
-    async with asyncio.TaskGroup() as tg:
-        tg.create_task(runtime.run(parallel_saga))
-        await done.wait()
+    await run_saga_until(runtime, parallel_saga)
 
 @pytest.mark.asyncio
-async def test_race_condition():
+async def test_all_cancels_siblings_on_error(runtime):
+    """Test that a failing effect in All cancels the others before propagating"""
+    order = []
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def wait_forever():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            await asyncio.sleep(0.01)
+            order.append("cleanup")
+
+    async def failing_saga():
+        yield All([Call(fail), Call(wait_forever)])
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        await asyncio.wait_for(runtime.run(failing_saga), timeout=1)
+    order.append("raised")
+    assert excinfo.value.subgroup(ValueError) is not None
+    assert order == ["cleanup", "raised"]
+
+@pytest.mark.asyncio
+async def test_all_reuses_plan_for_hoisted_tuple(runtime):
+    """Test that only a hoisted tuple of effects has its plan cached"""
+    async def echo(value):
+        return value
+
+    effects = (Call(echo, 1), Call(echo, 2))
+
+    async def repeated_all_saga():
+        for _ in range(3):
+            results = yield All(effects)
+            assert results == [1, 2]
+
+    async def inline_all_saga():
+        for value in range(3):
+            results = yield All((Call(echo, value),))
+            assert results == [value]
+
+    await run_saga_until(runtime, repeated_all_saga)
+    assert runtime._plan_cache[id(effects)][0] is effects
+
+    await run_saga_until(runtime, inline_all_saga)
+    assert len(runtime._plan_cache) == 1
+
+@pytest.mark.asyncio
+async def test_race_condition(runtime):
     """Test racing between multiple effects"""
-    done = asyncio.Event()
-    
     async def slow_increment():
-        await asyncio.sleep(0.1)
+        await asyncio.sleep(10)
         return "SLOW"
     
     async def fast_increment():
@@ -89,32 +163,89 @@ async def test_race_condition():
             "slow": Call(slow_increment),
             "fast": Call(fast_increment)
         })
-        assert "fast" in result
-        assert result["fast"] == "FAST"
-        done.set()
+        assert result == {"fast": "FAST"}
         
-    runtime = SagaRuntime()  # No store needed for Call effects
-    async with asyncio.TaskGroup() as tg:
-        tg.create_task(runtime.run(race_saga))
-        await done.wait()
+    await run_saga_until(runtime, race_saga, timeout=1)
+
+@pytest.mark.asyncio
+async def test_single_effect_all_and_race(runtime):
+    """Test All and Race with a single effect"""
+    async def fail():
+        raise ValueError("boom")
+
+    async def single_saga():
+        assert (yield All([Call(len, "abc")])) == [3]
+        assert (yield Race({"only": Call(len, "ab")})) == {"only": 2}
+        result = yield Race({"only": Call(fail)})
+        assert isinstance(result["only"], ValueError)
+
+    await run_saga_until(runtime, single_saga)
+
+@pytest.mark.asyncio
+async def test_sync_call(runtime):
+    """Test calling a plain synchronous function"""
+    def add(a, b):
+        return a + b
+
+    async def sync_call_saga():
+        result = yield Call(add, 1, b=2)
+        assert result == 3
+
+    await run_saga_until(runtime, sync_call_saga)
+
+@pytest.mark.asyncio
+async def test_effect_subclass_uses_base_handler(runtime):
+    """Test that subclassed effects are handled like their base effect"""
+    class LoggedCall(Call):
+        __slots__ = ()
+
+    async def subclass_saga():
+        assert (yield LoggedCall(len, "abc")) == 3
+        assert (yield All([LoggedCall(len, "ab")])) == [2]
+
+    await run_saga_until(runtime, subclass_saga)
+    assert runtime._subclass_handlers[LoggedCall] == runtime._handle_call
+    assert LoggedCall not in runtime._dispatch
+
+    runtime.reset()
+    assert LoggedCall not in runtime._subclass_handlers
 
-@dataclass
+@pytest.mark.asyncio
+async def test_unknown_effect_raises(runtime):
+    """Test that yielding something that is not an effect fails the saga"""
+    async def bad_saga():
+        yield "not an effect"
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        await run_saga_until(runtime, bad_saga)
+    assert excinfo.value.subgroup(ValueError) is not None
+
+@pytest.mark.asyncio
+async def test_empty_race_raises(runtime):
+    """Test that a race without effects fails the saga with a clear error"""
+    async def empty_race_saga():
+        yield Race({})
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        await run_saga_until(runtime, empty_race_saga)
+    errors = excinfo.value.subgroup(ValueError).exceptions
+    assert str(errors[0]) == "Race requires at least one effect"
+
+@dataclass(slots=True)
 class StartFork(Action):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class ForkStarted(Action):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class ForkCompleted(Action):
     pass
 
 @pytest.mark.asyncio
-async def test_fork_saga():
+async def test_fork_saga(runtime):
     """Test forking a saga"""
-    done = asyncio.Event()
-    
     async def child_saga():
         yield Put(ForkStarted())
         yield Put(ForkCompleted())
@@ -123,12 +254,244 @@ async def test_fork_saga():
         yield Take(StartFork)
         yield Fork(child_saga)
         yield Take(ForkCompleted)
-        done.set()
-    
-    store = MockStore()
-    runtime = SagaRuntime(store)
     
+    await run_saga_until(runtime, parent_saga, StartFork())
+
+@pytest.mark.asyncio
+async def test_pooled_effects_are_recycled(runtime):
+    """Test that effects built with new() are returned to their pool"""
+    seen = []
+
+    async def double(x):
+        return x * 2
+
+    async def pooled_saga():
+        for i in range(3):
+            effect = Call.new(double, i)
+            seen.append(effect)
+            result = yield effect
+            assert result == i * 2
+
+    await run_saga_until(runtime, pooled_saga)
+
+    assert seen[0] is seen[1] is seen[2]
+    assert seen[0].fn is None
+
+@pytest.mark.asyncio
+async def test_concurrent_takes_receive_their_own_actions(runtime):
+    """Test that concurrent Takes are each woken by the action they wait for"""
+    received = {}
+
+    async def take_saga(pattern):
+        received[pattern] = yield Take(pattern)
+
     async with asyncio.TaskGroup() as tg:
-        tg.create_task(runtime.run(parent_saga))
+        tg.create_task(runtime.run(take_saga, StartFork))
+        tg.create_task(runtime.run(take_saga, "FORKCOMPLETED"))
+        await asyncio.sleep(0)
+        await runtime.dispatch(ForkCompleted())
+        await runtime.dispatch(ForkStarted())
         await runtime.dispatch(StartFork())
-        await done.wait()
+
+    assert isinstance(received[StartFork], StartFork)
+    assert isinstance(received["FORKCOMPLETED"], ForkCompleted)
+    assert list(runtime._pending_actions) == [ForkStarted()]
+
+@pytest.mark.asyncio
+async def test_cancelled_takes_leave_the_index(runtime):
+    """Test that Takes losing a race are removed from the waiter index"""
+    async def now():
+        return "now"
+
+    async def racing_saga():
+        for _ in range(3):
+            result = yield Race({"start": Take(StartFork), "now": Call(now)})
+            assert result == {"now": "now"}
+
+    await run_saga_until(runtime, racing_saga)
+    assert not runtime._takers[StartFork]
+
+@pytest.mark.asyncio
+async def test_pending_actions_are_bounded(caplog):
+    """Test that unclaimed actions beyond the limit drop the oldest ones, warning once"""
+    runtime = SagaRuntime(max_pending_actions=2)
+    for action in (StartFork(), ForkStarted(), ForkCompleted(), StartFork()):
+        await runtime.dispatch(action)
+    assert list(runtime._pending_actions) == [ForkCompleted(), StartFork()]
+    warnings = [r for r in caplog.records if r.levelname == "WARNING"]
+    assert len(warnings) == 1 and "StartFork()" in warnings[0].getMessage()
+
+@pytest.mark.asyncio
+async def test_fork_does_not_block_parent(runtime):
+    """Test that a forked saga runs alongside its parent and is awaited by run()"""
+    order = []
+
+    async def child_saga():
+        yield Take(ForkStarted)
+        order.append("child")
+
+    async def parent_saga():
+        yield Fork(child_saga)
+        yield Put(ForkStarted())
+        order.append("parent")
+
+    await run_saga_until(runtime, parent_saga, timeout=1)
+    assert order == ["parent", "child"]
+
+@pytest.mark.asyncio
+async def test_take_with_predicate(runtime):
+    """Test taking an action with a predicate pattern"""
+    received = []
+
+    async def predicate_saga():
+        action = yield Take(lambda a: isinstance(a, Increment) and a.amount > 1)
+        received.append(action)
+
+    await run_saga_until(runtime, predicate_saga, Increment(amount=1), Increment(amount=2))
+
+    assert received == [Increment(amount=2)]
+    assert list(runtime._pending_actions) == [Increment(amount=1)]
+
+@pytest.mark.asyncio
+async def test_coroutine_saga(runtime):
+    """Test running and forking sagas that are plain coroutines"""
+    calls = []
+
+    async def coroutine_saga(name="forked"):
+        calls.append(name)
+
+    async def parent_saga():
+        yield Fork(coroutine_saga)
+
+    await runtime.run(coroutine_saga, "run")
+    await runtime.run(saga(coroutine_saga), "decorated")
+    await runtime.run(parent_saga)
+    assert calls == ["run", "decorated", "forked"]
+    assert runtime._saga_kinds[coroutine_saga] == COROUTINE
+    assert runtime._saga_kinds[parent_saga] == ASYNC_GENERATOR
+
+@pytest.mark.asyncio
+async def test_unhashable_saga(runtime):
+    """Test running a saga callable that cannot be used as a cache key"""
+    calls = []
+
+    class UnhashableSaga:
+        __name__ = "unhashable_saga"
+        __hash__ = None
+
+        async def __call__(self):
+            calls.append("run")
+            yield Put(Increment(amount=1))
+
+    await runtime.run(UnhashableSaga())
+    assert calls == ["run"]
+    assert runtime.store.get_state()["counter"] == 1
+
+@pytest.mark.asyncio
+async def test_reset_cancels_running_sagas(runtime):
+    """Test that reset cancels running sagas and drops pending actions"""
+    cancelled = []
+
+    async def blocked_call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("call")
+            raise
+
+    async def waiting_saga():
+        yield Take(StartFork)
+
+    async def calling_saga():
+        yield Call(blocked_call)
+
+    async def forking_saga():
+        yield Fork(calling_saga)
+        yield Take(StartFork)
+
+    runtime.dispatch_nowait(ForkStarted())
+    tasks = [asyncio.create_task(runtime.run(saga)) for saga in (waiting_saga, forking_saga)]
+    await asyncio.sleep(0.01)
+    runtime.reset()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+    assert cancelled == ["call"]
+    assert not runtime._pending_actions
+    assert not runtime._running_sagas
+
+@pytest.mark.asyncio
+async def test_bad_take_patterns_only_fail_their_own_saga(runtime):
+    """Test that invalid or failing Take patterns do not break dispatch"""
+    async def list_pattern_saga():
+        yield Take(["A", "B"])
+
+    async def failing_predicate_saga():
+        yield Take(lambda a: a.amount > 0)
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        await run_saga_until(runtime, list_pattern_saga)
+    assert excinfo.value.subgroup(TypeError) is not None
+
+    task = asyncio.create_task(runtime.run(failing_predicate_saga))
+    await asyncio.sleep(0.01)
+    await runtime.dispatch(StartFork())
+    with pytest.raises(ExceptionGroup) as excinfo:
+        await asyncio.wait_for(task, timeout=1)
+    assert excinfo.value.subgroup(AttributeError) is not None
+    assert list(runtime._pending_actions) == [StartFork()]
+
+@pytest.mark.asyncio
+async def test_select_cache_is_bounded(runtime):
+    """Test that inline selector lambdas do not grow the Select cache without bound"""
+    runtime.store.state["counter"] = 0
+
+    async def inline_select_saga():
+        for _ in range(MAX_CACHED_SELECTS * 2):
+            assert (yield Select(lambda s: s["counter"])) == 0
+
+    await run_saga_until(runtime, inline_select_saga)
+    assert len(runtime._select_cache) <= MAX_CACHED_SELECTS
+
+@dataclass(slots=True)
+class Special(Increment):
+    type = "SPECIAL"
+
+@pytest.mark.asyncio
+async def test_string_take_matches_on_type_string(runtime):
+    """Test that a string pattern ignores subclasses that override type"""
+    async def take_increment_saga():
+        action = yield Take("INCREMENT")
+        assert type(action) is Increment
+
+    await run_saga_until(runtime, take_increment_saga, Special(), Increment())
+    assert list(runtime._pending_actions) == [Special()]
+
+class Kind(StrEnum):
+    PING = "PING"
+
+@dataclass(slots=True)
+class Ping(Action):
+    type = Kind.PING
+
+@pytest.mark.asyncio
+async def test_str_enum_action_type(runtime):
+    """Test actions whose type is a StrEnum member"""
+    async def take_ping_saga():
+        assert isinstance((yield Take(Kind.PING)), Ping)
+        assert isinstance((yield Take("PING")), Ping)
+
+    await run_saga_until(runtime, take_ping_saga, Ping(), Ping())
+
+@pytest.mark.asyncio
+async def test_race_keeps_action_delivered_to_losing_take(runtime):
+    """Test that an action resolved for a losing Take stays available"""
+    async def racing_saga():
+        result = yield Race({"start": Take(StartFork), "started": Take(ForkStarted)})
+        assert list(result) == ["start"]
+        assert isinstance((yield Take(ForkStarted)), ForkStarted)
+
+    task = asyncio.create_task(runtime.run(racing_saga))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    runtime.dispatch_nowait(StartFork())
+    runtime.dispatch_nowait(ForkStarted())
+    await asyncio.wait_for(task, timeout=1)
@@ -0,0 +1,39 @@
+from saga.store import Store
+from saga.actions import Increment, Decrement
+
+
+def test_registered_reducers_update_state():
+    """Test that dispatch applies the reducer registered for the action class"""
+    store = Store({"counter": 0})
+    store.register_reducer(Increment, lambda s, a: {**s, "counter": s["counter"] + a.amount})
+
+    @store.reducer(Decrement)
+    def decrement(state, action):
+        return {**state, "counter": state["counter"] - action.amount}
+
+    store.dispatch(Increment(amount=5))
+    store.dispatch(Decrement(amount=2))
+    assert store.get_state() == {"counter": 3}
+
+
+def test_dispatch_without_reducer_leaves_state():
+    """Test that actions without a reducer pass through unchanged"""
+    store = Store({"counter": 1})
+    action = Increment()
+    assert store.dispatch(action) is action
+    assert store.get_state() == {"counter": 1}
+
+
+def test_subclass_without_super_init():
+    """Test that subclasses which skip Store.__init__ can dispatch and register reducers"""
+    class LegacyStore(Store):
+        def __init__(self, state=None):
+            self.state = state if state else {}
+
+    store = LegacyStore({"counter": 1})
+    store.dispatch(Increment())
+    assert store.get_state() == {"counter": 1}
+
+    store.register_reducer(Increment, lambda s, a: {**s, "counter": s["counter"] + a.amount})
+    store.dispatch(Increment())
+    assert store.get_state() == {"counter": 2}